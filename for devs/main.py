@@ -5,25 +5,35 @@ os.environ.setdefault("HF_HOME", "/opt/hf-cache")
 import sys
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from datetime import datetime
 import argparse
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import importlib.util
 import io
+import json
+from math import gcd
+import struct
+import threading
+import zlib
 
 # Load environment variables from a .env file (default: secrets.env)
 def _load_env_file(path: Path):
     if not path.exists():
         return
     try:
-        for raw in path.read_text(encoding="utf-8", errors="ignore").splitlines():
-            line = raw.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            k, v = line.split("=", 1)
-            k = k.strip()
-            v = v.strip().strip('"').strip("'")
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        pairs = (
+            line.partition("=")
+            for line in text.splitlines()
+            if "=" in line and not line.lstrip().startswith("#")
+        )
+        for k, _, v in pairs:
             # don't overwrite if already set in the environment
-            os.environ.setdefault(k, v)
+            os.environ.setdefault(k.strip(), v.strip().strip('"').strip("'"))
     except Exception as _e:
         # fail soft — just log later when logger is ready
         pass
@@ -37,11 +47,13 @@ if os.getenv("HF_TOKEN") and not os.getenv("HUGGINGFACE_HUB_TOKEN"):
 if os.getenv("AWS_DEFAULT_REGION") and not os.getenv("AWS_REGION"):
     os.environ["AWS_REGION"] = os.environ["AWS_DEFAULT_REGION"]
 
-import boto3
-from botocore.exceptions import ClientError
-import replicate
-from PIL import Image
-from PIL.PngImagePlugin import PngInfo
+# Heavy third-party packages (boto3, replicate, aiohttp, PIL) are
+# imported inside the functions that use them, so --help and argument
+# errors exit without loading them.
+if TYPE_CHECKING:
+    import aiohttp
+    import replicate
+    from replicate.exceptions import ReplicateError
 
 # Setup logging
 logging.basicConfig(
@@ -52,6 +64,26 @@ logger = logging.getLogger(__name__)
 
 MODEL_ID = "stability-ai/stable-diffusion-3.5-large"
 
+# Rate-limited (429) prediction creates are retried with exponential backoff
+REPLICATE_MAX_ATTEMPTS = 5
+
+# Metadata that is identical for every image (PNG text chunks and S3 metadata)
+STATIC_METADATA = {
+    "model": "stable-diffusion-3.5-large",
+    "generator": "replicate-client",
+}
+
+# Multipart settings for S3 uploads (large PNGs are sent in parallel parts)
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Connections in the shared S3 client pool (parallel uploads x multipart threads must fit)
+S3_MAX_POOL_CONNECTIONS = 32
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Content-addressed cache of generated images (same inputs -> same S3 object)
+CACHE_PREFIX = "images/cache"
+
 def get_replicate_token() -> str:
     """Retrieve the Replicate token from environment variables."""
     token = os.getenv("REPLICATE_API_TOKEN")
@@ -61,22 +93,21 @@ def get_replicate_token() -> str:
         )
     return token
 
-def generate_image_with_replicate(
+def _build_replicate_inputs(
     prompt: str,
-    steps: int = 28,          # not used by this model (kept for compatibility)
-    guidance: float = 3.5,    # mapped to "cfg"
-    seed: Optional[int] = None,
-    width: int = 1024,
-    height: int = 1024,
-    output_format: str = "png"
-) -> Image.Image:
-    token = get_replicate_token()
-    client = replicate.Client(api_token=token)
-
-    # width/height -> aspect_ratio (Replicate schema)
-    from math import gcd
-    g = gcd(max(width,1), max(height,1))
-    ar = f"{width//g}:{height//g}"
+    guidance: float,
+    seed: Optional[int],
+    width: int,
+    height: int,
+    output_format: str
+) -> dict:
+    """Map the CLI parameters onto the Replicate input schema."""
+    # width/height -> aspect_ratio (Replicate schema); square is the model default
+    if width == height:
+        ar = None
+    else:
+        g = gcd(max(width,1), max(height,1))
+        ar = f"{width//g}:{height//g}"
 
     inputs = {
         "prompt": prompt,
@@ -85,78 +116,247 @@ def generate_image_with_replicate(
     }
     if seed is not None:
         inputs["seed"] = seed
-    if ar != "1:1":
+    if ar:
         inputs["aspect_ratio"] = ar
+    return inputs
+
+def _handle_replicate_error(e: "ReplicateError"):
+    """Log/translate known Replicate failures; the caller re-raises."""
+    if e.status == 404:
+        logger.error("Model slug not found: use 'stability-ai/stable-diffusion-3.5-large'")
+    elif e.status == 401:
+        raise ValueError("Invalid Replicate token (REPLICATE_API_TOKEN).") from e
+
+def _retry_delay(e: "ReplicateError", attempt: int) -> Optional[int]:
+    """Backoff in seconds if the create was rate-limited and attempts remain, else None."""
+    if attempt >= REPLICATE_MAX_ATTEMPTS or e.status != 429:
+        return None
+    delay = 2 ** attempt
+    logger.warning(f"Replicate returned 429; retrying in {delay}s")
+    return delay
+
+async def _create_prediction(client: "replicate.Client", inputs: dict):
+    """
+    Create the prediction, retrying only rate-limited creates: once it
+    exists, a retry would start (and bill) a second prediction.
+    """
+    from replicate.exceptions import ReplicateError
+
+    attempt = 1
+    while True:
+        try:
+            return await client.predictions.async_create(model=MODEL_ID, input=inputs)
+        except ReplicateError as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None:
+                _handle_replicate_error(e)
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+async def _download_output(output, http: "aiohttp.ClientSession") -> bytes:
+    """Download the prediction output (a URL, or a list holding one) as raw bytes."""
+    url = output[0] if isinstance(output, list) else output
+    if not isinstance(url, str):
+        raise RuntimeError(f"Unexpected output type: {type(url)}")
+    # shared session: pooled connections, no new TLS handshake per prompt
+    async with http.get(url) as r:
+        r.raise_for_status()
+        return await r.read()
+
+async def generate_image_with_replicate(
+    prompt: str,
+    steps: int = 28,          # not used by this model (kept for compatibility)
+    guidance: float = 3.5,    # mapped to "cfg"
+    seed: Optional[int] = None,
+    width: int = 1024,
+    height: int = 1024,
+    output_format: str = "png",
+    *,
+    client: "replicate.Client",
+    http: "aiohttp.ClientSession"
+) -> bytes:
+    """
+    Generate one image and return its raw encoded bytes (no decode).
+    The Replicate client and http session are shared by the whole batch.
+    """
+    inputs = _build_replicate_inputs(prompt, guidance, seed, width, height, output_format)
 
     logger.info(f"Generating with cfg={guidance}, aspect_ratio={inputs.get('aspect_ratio','1:1')}")
+    prediction = await _create_prediction(client, inputs)
     try:
-        out = client.run(MODEL_ID, input=inputs)
-
-        # normalize: it can be a FileOutput or URL string
-        fo = out[0] if isinstance(out, list) else out
-        if hasattr(fo, "read"):
-            data = fo.read()
-        elif isinstance(fo, str):
-            import requests
-            r = requests.get(fo); r.raise_for_status()
-            data = r.content
-        else:
-            raise RuntimeError(f"Unexpected output type: {type(fo)}")
+        # polling is retried by the client's transport; never re-create here
+        await prediction.async_wait()
+        if prediction.status != "succeeded":
+            raise RuntimeError(f"Prediction {prediction.status}: {prediction.error}")
 
-        return Image.open(io.BytesIO(data))
+        # raw encoded bytes: no decode here, metadata is spliced in later
+        return await _download_output(prediction.output, http)
     except Exception as e:
-        msg = str(e)
-        if "404" in msg:
-            logger.error("Model slug not found: use 'stability-ai/stable-diffusion-3.5-large'")
-        elif "401" in msg or "unauthorized" in msg.lower():
-            raise ValueError("Invalid Replicate token (REPLICATE_API_TOKEN).")
+        logger.error(f"Prediction {prediction.id} failed after creation: {e}")
         raise
 
-def create_filename_with_date(prefix: str = "sd3") -> str:
+def create_filename_with_date(
+    prefix: str = "sd3",
+    index: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> str:
     """
     Generate a filename with a timestamp.
-    Example: sd3_2025-10-13.png
+    Example: sd3_2025-10-13.png (sd3_2025-10-13_2.png with index=2)
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d")
-    return f"{prefix}_{timestamp}.png"
+    timestamp = (now or datetime.now()).strftime("%Y-%m-%d")
+    suffix = f"_{index}" if index is not None else ""
+    return f"{prefix}_{timestamp}{suffix}.png"
 
-def create_s3_key_organized(base_path: str = "images") -> str:
+def create_s3_key_organized(
+    base_path: str = "images",
+    index: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> str:
     """
     Create an S3 key organized by year/month/day.
     Example: images/2025/10/13/sd3_2025-10-13_143052.png
     """
-    now = datetime.now()
-    year = now.strftime("%Y")
-    month = now.strftime("%m")
-    day = now.strftime("%d")
-    filename = create_filename_with_date()
+    now = now or datetime.now()
+    filename = create_filename_with_date(index=index, now=now)
     
-    return f"{base_path}/{year}/{month}/{day}/{filename}"
+    return f"{base_path}/{now:%Y/%m/%d}/{filename}"
 
-def add_metadata_to_image(
-    image: Image.Image,
+def build_png_metadata(
     prompt: str,
     steps: int,
     guidance: float,
-    seed: Optional[int] = None
-) -> tuple[Image.Image, PngInfo]:
-    """Add PNG metadata to the image."""
-    metadata = PngInfo()
-    
-    metadata.add_text("prompt", prompt)
-    metadata.add_text("steps", str(steps))
-    metadata.add_text("guidance_scale", str(guidance))
+    seed: Optional[int] = None,
+    generated_at: Optional[str] = None
+) -> dict:
+    """
+    Build the per-image PNG text metadata.
+    STATIC_METADATA is not included: it is pre-serialized once at import.
+    """
+    metadata = {
+        "prompt": prompt,
+        "steps": str(steps),
+        "guidance_scale": str(guidance),
+    }
     if seed:
-        metadata.add_text("seed", str(seed))
-    
-    metadata.add_text("generated_at", datetime.now().isoformat())
-    metadata.add_text("model", "stable-diffusion-3.5-large")
-    metadata.add_text("generator", "replicate-client")
-    
-    return image, metadata
+        metadata["seed"] = str(seed)
+
+    metadata["generated_at"] = generated_at or datetime.now().isoformat()
+
+    return metadata
+
+# CRC32 state after the chunk type: crc32(type + payload) == crc32(payload, state)
+_TEXT_CRC = zlib.crc32(b"tEXt")
+_ITXT_CRC = zlib.crc32(b"iTXt")
+
+def _png_chunk(chunk_type: bytes, type_crc: int, payload: bytes) -> bytes:
+    """Serialize one PNG chunk: length, type, payload, CRC32(type + payload)."""
+    return (
+        len(payload).to_bytes(4, "big")
+        + chunk_type
+        + payload
+        + zlib.crc32(payload, type_crc).to_bytes(4, "big")
+    )
+
+def _png_text_chunk(keyword: str, value: str) -> bytes:
+    """tEXt chunk for Latin-1 text, uncompressed iTXt otherwise (like PIL)."""
+    key = keyword.encode("latin-1")
+    try:
+        return _png_chunk(b"tEXt", _TEXT_CRC, key + b"\0" + value.encode("latin-1"))
+    except UnicodeEncodeError:
+        # keyword, flag=0, method=0, empty language tag, empty translated keyword
+        return _png_chunk(b"iTXt", _ITXT_CRC, key + b"\0\0\0\0\0" + value.encode("utf-8"))
+
+# Serialized once (CRCs included): these chunks are byte-for-byte the same
+# for every image, so only the dynamic chunks are checksummed per call
+_STATIC_TEXT_CHUNKS = b"".join(_png_text_chunk(k, v) for k, v in STATIC_METADATA.items())
+
+def inject_png_text_chunks(raw_bytes: bytes, texts: dict) -> bytes:
+    """
+    Insert text chunks (texts plus STATIC_METADATA) right after IHDR
+    without decoding the image.
+    Chunks are walked on a memoryview (only IHDR/tEXt/iTXt/IEND are looked
+    at) and existing text chunks with the same keywords are replaced, so
+    the pixel data is shipped unchanged and never copied before the join.
+    """
+    mv = memoryview(raw_bytes)
+    if mv[:8] != PNG_SIGNATURE:
+        raise ValueError("Not a PNG image")
+    if mv[12:16] != b"IHDR":
+        raise ValueError("Malformed PNG: IHDR must be the first chunk")
+
+    keywords = {k.encode("latin-1") for k in texts}
+    keywords.update(k.encode("latin-1") for k in STATIC_METADATA)
+    new_chunks = b"".join(_png_text_chunk(k, v) for k, v in texts.items()) + _STATIC_TEXT_CHUNKS
+
+    parts = [mv[:8]]
+    pos = 8
+    while True:
+        if pos + 8 > len(mv):
+            raise ValueError("Malformed PNG: missing IEND chunk")
+        (length,) = struct.unpack_from(">I", mv, pos)
+        chunk_type = mv[pos + 4:pos + 8]
+        end = pos + 12 + length
+        if chunk_type == b"IHDR":
+            parts.append(mv[pos:end])
+            parts.append(new_chunks)
+        elif chunk_type == b"tEXt" or chunk_type == b"iTXt":
+            # keywords are at most 79 bytes, so only peek at the chunk head
+            head = bytes(mv[pos + 8:pos + 8 + min(length, 80)])
+            if head.split(b"\0", 1)[0] not in keywords:
+                parts.append(mv[pos:end])
+        else:
+            parts.append(mv[pos:end])
+            if chunk_type == b"IEND":
+                break
+        pos = end
+    return b"".join(parts)
+
+def _ensure_png(data: bytes) -> bytes:
+    """Re-encode to PNG only if the model returned another format."""
+    if data[:8] == PNG_SIGNATURE:
+        return data
+    logger.info("Model output is not PNG; re-encoding")
+    from PIL import Image
+    buf = io.BytesIO()
+    # fast DEFLATE: latency matters more than object size for cached images
+    Image.open(io.BytesIO(data)).save(buf, format="PNG", compress_level=1, optimize=False)
+    return buf.getvalue()
+
+def verify_png(data: bytes):
+    """Fully decode the PNG with Pillow (optional dependency) to check integrity."""
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        logger.info(f"✓ PNG verified ({img.width}x{img.height}, {img.mode})")
+
+# lru_cache has no lock: without this, worker threads could build clients concurrently
+_S3_CLIENT_LOCK = threading.Lock()
+
+def _s3_client(region: Optional[str] = None):
+    """Return a shared S3 client for the region (reuses the connection pool)."""
+    with _S3_CLIENT_LOCK:
+        return _build_s3_client(region)
+
+@functools.lru_cache(maxsize=4)
+def _build_s3_client(region: Optional[str]):
+    """Create an S3 client from a private session (boto3's default one is not thread-safe)."""
+    import boto3
+    from botocore.config import Config as BotoConfig
+
+    session = boto3.session.Session()
+    return session.client(
+        "s3",
+        region_name=region,
+        config=BotoConfig(
+            max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+            retries={"max_attempts": 5, "mode": "adaptive"},
+        ),
+    )
 
 def upload_to_s3(
-    local_path: Path,
+    fileobj: io.BufferedIOBase,
     bucket: str,
     key: str,
     prompt: str,
@@ -164,13 +364,19 @@ def upload_to_s3(
     guidance: float,
     seed: Optional[int],
     region: Optional[str] = None,
-    public: bool = False
+    public: bool = False,
+    max_concurrency: int = 8,
+    generated_at: Optional[str] = None
 ) -> dict:
     """
     Upload to S3 with metadata and optional public URL handling.
     Return a dictionary with all the information.
     """
-    s3 = boto3.client("s3", region_name=region)
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+
+    generated_at = generated_at or datetime.now().isoformat()
+    s3 = _s3_client(region)
     region = region or "eu-central-1"
     
     # S3 metadata (visible in the object properties)
@@ -178,9 +384,8 @@ def upload_to_s3(
         "prompt": prompt[:1024],  # S3 limits metadata entries to 2KB
         "steps": str(steps),
         "guidance": str(guidance),
-        "generated-at": datetime.now().isoformat(),
-        "model": "stable-diffusion-3.5-large",
-        "generator": "replicate-client"
+        "generated-at": generated_at,
+        **STATIC_METADATA,
     }
     if seed:
         s3_metadata["seed"] = str(seed)
@@ -191,25 +396,32 @@ def upload_to_s3(
         "Metadata": s3_metadata,
         "CacheControl": "public, max-age=31536000",  # Cache for 1 year
     }
-    
+
+    # Multipart upload: parts are PUT concurrently once over the threshold
+    transfer_config = TransferConfig(
+        multipart_threshold=MULTIPART_CHUNK_SIZE,
+        multipart_chunksize=MULTIPART_CHUNK_SIZE,
+        max_concurrency=max_concurrency,
+        use_threads=True,
+    )
+
+    # Generate URLs once; reused for logging and the result
+    s3_uri = f"s3://{bucket}/{key}"
+    public_url = f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
 
     try:
-        logger.info(f"Uploading to s3://{bucket}/{key}")
-        s3.upload_file(str(local_path), bucket, key, ExtraArgs=extra_args)
-        
-        # Generate URLs
-        s3_uri = f"s3://{bucket}/{key}"
-        public_url = f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
+        logger.info(f"Uploading to {s3_uri}")
+        s3.upload_fileobj(fileobj, bucket, key, ExtraArgs=extra_args, Config=transfer_config)
         
         result = {
             "s3_uri": s3_uri,
             "public_url": public_url,
             "key": key,
-            "filename": Path(key).name,
+            "filename": key.rsplit("/", 1)[-1],
             "bucket": bucket,
             "region": region,
             "is_public": public,
-            "generated_at": datetime.now().isoformat(),
+            "generated_at": generated_at,
             "prompt": prompt,
             "metadata": s3_metadata
         }
@@ -230,12 +442,229 @@ def upload_to_s3(
             logger.error(f"S3 upload failed: {e}")
         raise
 
+def image_cache_key(
+    prompt: str,
+    guidance: float,
+    seed: int,
+    width: int,
+    height: int
+) -> str:
+    """
+    Build the S3 cache key from a hash of the canonicalized model inputs.
+    Example: images/cache/3f/3fa1...e9.png
+    """
+    inputs = _build_replicate_inputs(prompt, guidance, seed, width, height, "png")
+    payload = json.dumps({
+        "prompt": prompt,
+        "cfg": guidance,
+        "seed": seed,
+        "ar": inputs.get("aspect_ratio", "1:1"),
+        "model": MODEL_ID,
+    }, sort_keys=True)
+    key_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{CACHE_PREFIX}/{key_hash[:2]}/{key_hash}.png"
+
+def load_cached_image(bucket: str, cache_key: str, region: Optional[str] = None) -> Optional[bytes]:
+    """Return the cached PNG bytes for cache_key, or None on a cache miss."""
+    from botocore.exceptions import ClientError
+
+    s3 = _s3_client(region)
+    try:
+        # A single GET doubles as the existence check (no separate HEAD round-trip)
+        data = s3.get_object(Bucket=bucket, Key=cache_key)["Body"].read()
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        if error_code in ('NoSuchKey', '404', 'NotFound'):
+            return None
+        if error_code in ('AccessDenied', '403'):
+            # without s3:ListBucket, S3 reports a missing key as 403
+            logger.warning(f"Cache lookup denied for {cache_key}; treating as a miss")
+            return None
+        raise
+    logger.info(f"Cache hit: s3://{bucket}/{cache_key}")
+    return data
+
+def store_cached_image(bucket: str, source_key: str, cache_key: str, region: Optional[str] = None):
+    """Copy an uploaded image to its cache key (server-side, no re-upload)."""
+    from botocore.exceptions import ClientError
+
+    s3 = _s3_client(region)
+    try:
+        s3.copy_object(
+            Bucket=bucket,
+            Key=cache_key,
+            CopySource={"Bucket": bucket, "Key": source_key},
+        )
+        logger.info(f"Cached as s3://{bucket}/{cache_key}")
+    except ClientError as e:
+        # the image itself is already uploaded; a cache write failure is not fatal
+        logger.warning(f"Could not write cache entry {cache_key}: {e}")
+
+def _cache_key_for(args: argparse.Namespace, prompt: str) -> Optional[str]:
+    """Cache only when enabled with --cache (which requires an explicit seed)."""
+    if not args.cache or args.seed is None:
+        return None
+    return image_cache_key(prompt, args.guidance, args.seed, args.width, args.height)
+
+def _resolve_s3_key(
+    args: argparse.Namespace,
+    now: datetime,
+    index: Optional[int] = None
+) -> str:
+    """Determine the S3 key from the CLI arguments (index disambiguates batches)."""
+    if args.key:
+        # Use the key provided by the user
+        return args.key
+    elif args.organized:
+        # Organize by date: images/2025/10/13/sd3_2025-10-13_143052.png
+        return create_s3_key_organized(index=index, now=now)
+    else:
+        # Simple name with date: sd3_2025-10-13_143052.png
+        return create_filename_with_date(index=index, now=now)
+
+def _tag_and_upload(
+    data: bytes,
+    prompt: str,
+    s3_key: str,
+    args: argparse.Namespace,
+    generated_at: str,
+    cache_key: Optional[str] = None
+) -> dict:
+    """
+    Splice the metadata into the PNG bytes and upload them to S3.
+    When cache_key is given, the uploaded object is also stored in the cache.
+    """
+    png_metadata = build_png_metadata(
+        prompt=prompt,
+        steps=args.steps,
+        guidance=args.guidance,
+        seed=args.seed,
+        generated_at=generated_at
+    )
+    data = inject_png_text_chunks(_ensure_png(data), png_metadata)
+    logger.info(f"Metadata added to PNG ({len(data)} bytes)")
+    if args.verify:
+        verify_png(data)
+
+    # Upload to S3 straight from memory
+    result = upload_to_s3(
+        io.BytesIO(data),
+        args.bucket,
+        key=s3_key,
+        prompt=prompt,
+        steps=args.steps,
+        guidance=args.guidance,
+        seed=args.seed,
+        region=args.region,
+        public=args.public,
+        max_concurrency=args.s3_concurrency,
+        generated_at=generated_at
+    )
+
+    if cache_key:
+        store_cached_image(args.bucket, s3_key, cache_key, args.region)
+
+    return result
+
+async def _generate_and_upload_batch(
+    args: argparse.Namespace,
+    prompts: list[str],
+    s3_keys: list[str],
+    generated_at: str
+) -> list:
+    """
+    Generate all prompts concurrently (a single prompt takes the same path),
+    at most --max-concurrent-predictions at a time; each upload is handed to
+    a thread pool so it overlaps with the predictions still in flight.
+    Returns one entry per prompt: the upload result, or the exception raised.
+    """
+    import aiohttp
+    import httpx
+    import replicate
+
+    loop = asyncio.get_running_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=args.upload_workers)
+    prediction_slots = asyncio.Semaphore(args.max_concurrent_predictions)
+    # one session per batch so URL downloads reuse connections
+    http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+    # one Replicate client per batch; its transport is ours so it can be closed
+    replicate_transport = httpx.AsyncHTTPTransport()
+    client = replicate.Client(api_token=get_replicate_token(), transport=replicate_transport)
+
+    async def _one(prompt: str, s3_key: str) -> dict:
+        cache_key = _cache_key_for(args, prompt)
+        data = None
+        if cache_key:
+            data = await loop.run_in_executor(executor, load_cached_image, args.bucket, cache_key, args.region)
+        if data is not None:
+            cache_key = None  # already cached
+        else:
+            async with prediction_slots:
+                data = await generate_image_with_replicate(
+                    prompt=prompt,
+                    steps=args.steps,
+                    guidance=args.guidance,
+                    seed=args.seed,
+                    width=args.width,
+                    height=args.height,
+                    client=client,
+                    http=http,
+                )
+        return await loop.run_in_executor(executor, _tag_and_upload, data, prompt, s3_key, args, generated_at, cache_key)
+
+    try:
+        return await asyncio.gather(
+            *(_one(p, k) for p, k in zip(prompts, s3_keys)),
+            return_exceptions=True,
+        )
+    finally:
+        await http.close()
+        await replicate_transport.aclose()
+        # all uploads are done once gather returns; never block the loop here
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _read_prompts_file(path: Path) -> list[str]:
+    """Read one prompt per line, skipping blank lines and # comments."""
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+def _print_result(result: dict, public: bool):
+    """Print the human-readable summary for one uploaded image."""
+    print("\n" + "="*60)
+    print("✅ IMAGE GENERATED AND UPLOADED SUCCESSFULLY")
+    print("="*60)
+    print(f"📁 S3 URI:      {result['s3_uri']}")
+    print(f"📄 Filename:    {result['filename']}")
+    print(f"📅 Generated:   {result['generated_at']}")
+
+    if public:
+        print(f"🌐 Public URL:  {result['public_url']}")
+        print("\n💡 You can share this URL directly!")
+    else:
+        print("\n💡 Image is private. Use --public flag for public access.")
+        print(f"   Or configure bucket policy for public reads.")
+
+    print("="*60 + "\n")
+
+def _positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {number}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate images with Stable Diffusion 3.5 via Replicate API and upload to S3"
     )
     parser.add_argument("--bucket", default=os.getenv("S3_BUCKET"), help="S3 bucket name (default from S3_BUCKET)")
-    parser.add_argument("--prompt", required=True, help="Text prompt for generation")
+    parser.add_argument("--prompt", action="append", default=[],
+                       help="Text prompt for generation (repeat to generate several images concurrently)")
+    parser.add_argument("--prompts-file", type=Path,
+                       help="File with one prompt per line, generated in the same run as --prompt values")
     parser.add_argument("--key", help="S3 key (optional, auto-generated with date if not provided)")
     parser.add_argument("--organized", action="store_true", 
                        help="Organize files by date (images/YYYY/MM/DD/filename.png)")
@@ -247,11 +676,45 @@ def main():
     parser.add_argument("--region", default=os.getenv("AWS_DEFAULT_REGION"), help="AWS region (default from AWS_DEFAULT_REGION, else eu-central-1)")
     parser.add_argument("--public", action="store_true", 
                        help="Make image publicly accessible via URL")
+    parser.add_argument("--s3-concurrency", type=_positive_int, default=8,
+                       help="Max parallel threads for multipart S3 uploads")
+    parser.add_argument("--upload-workers", type=_positive_int, default=4,
+                       help="Max images uploaded in parallel when generating several prompts")
+    parser.add_argument("--max-concurrent-predictions", type=_positive_int, default=4,
+                       help="Max Replicate predictions running at once (avoids 429 rate limits)")
+    parser.add_argument("--verify", action="store_true",
+                       help="Decode each PNG with Pillow before upload to check its integrity")
+    parser.add_argument("--cache", action="store_true",
+                       help="Reuse (and store) images with identical inputs in S3 under images/cache/; requires --seed")
     args = parser.parse_args()
     
     # Resolve bucket from env if not provided, and fail fast if missing
     if not args.bucket:
         parser.error("Missing --bucket and S3_BUCKET not set in environment (.env)")
+    prompts = list(args.prompt)
+    if args.prompts_file:
+        try:
+            prompts += _read_prompts_file(args.prompts_file)
+        except OSError as e:
+            parser.error(f"Cannot read --prompts-file: {e}")
+    if not prompts:
+        parser.error("At least one --prompt (or a non-empty --prompts-file) is required")
+    if args.cache and args.seed is None:
+        parser.error("--cache requires --seed (unseeded generations are not reproducible)")
+    if args.verify and importlib.util.find_spec("PIL") is None:
+        parser.error("--verify requires Pillow (pip install Pillow)")
+    if args.key and len(prompts) > 1:
+        parser.error("--key can only be used with a single prompt")
+
+    # Parallel uploads x multipart threads share one S3 connection pool
+    args.upload_workers = min(args.upload_workers, len(prompts), S3_MAX_POOL_CONNECTIONS)
+    max_concurrency = S3_MAX_POOL_CONNECTIONS // args.upload_workers
+    if args.s3_concurrency > max_concurrency:
+        logger.warning(
+            f"Capping --s3-concurrency at {max_concurrency} to fit the "
+            f"{S3_MAX_POOL_CONNECTIONS}-connection S3 pool"
+        )
+        args.s3_concurrency = max_concurrency
     
     # Info for debugging env loading
     logger.info(f"Using bucket: {args.bucket}")
@@ -263,78 +726,40 @@ def main():
         _ = get_replicate_token()
         logger.info("✓ Replicate token found")
         
-        # Generate image via Replicate client
-        img = generate_image_with_replicate(
-            prompt=args.prompt,
-            steps=args.steps,
-            guidance=args.guidance,
-            seed=args.seed,
-            width=args.width,
-            height=args.height,
-        )
-        
-        # Add metadata to image
-        img, png_metadata = add_metadata_to_image(
-            img,
-            prompt=args.prompt,
-            steps=args.steps,
-            guidance=args.guidance,
-            seed=args.seed
-        )
+        # One timestamp per run: keys, PNG and S3 metadata all agree
+        now = datetime.now()
+        generated_at = now.isoformat()
 
-        # Determine S3 key
-        if args.key:
-            # Use the key provided by the user
-            s3_key = args.key
-        elif args.organized:
-            # Organize by date: images/2025/10/13/sd3_2025-10-13_143052.png
-            s3_key = create_s3_key_organized()
+        if len(prompts) == 1:
+            s3_keys = [_resolve_s3_key(args, now)]
         else:
-            # Simple name with date: sd3_2025-10-13_143052.png
-            s3_key = create_filename_with_date()
-        
-        # Save temporarily with metadata
-        tmp_path = Path("/tmp") / Path(s3_key).name
-        img.save(tmp_path, pnginfo=png_metadata)
-        logger.info(f"Image saved temporarily to {tmp_path}")
-
-        # Upload to S3
-        result = upload_to_s3(
-            tmp_path, 
-            args.bucket, 
-            key=s3_key,
-            prompt=args.prompt,
-            steps=args.steps,
-            guidance=args.guidance,
-            seed=args.seed,
-            region=args.region,
-            public=args.public
-        )
-        
-        # Cleanup
-        tmp_path.unlink()
-        logger.info("Temporary file deleted")
+            # Several prompts: numbered keys so they don't collide
+            s3_keys = [_resolve_s3_key(args, now, index=i) for i in range(1, len(prompts) + 1)]
+
+        # Generate concurrently, overlap uploads
+        outcomes = asyncio.run(_generate_and_upload_batch(args, prompts, s3_keys, generated_at))
+
+        # One failed prompt must not hide the images that were uploaded
+        results = []
+        failures = 0
+        for prompt, outcome in zip(prompts, outcomes):
+            if isinstance(outcome, BaseException):
+                failures += 1
+                logger.error(f"Fatal error for prompt {prompt!r}: {outcome}", exc_info=outcome)
+            else:
+                results.append(outcome)
         
         # Output the results
-        print("\n" + "="*60)
-        print("✅ IMAGE GENERATED AND UPLOADED SUCCESSFULLY")
-        print("="*60)
-        print(f"📁 S3 URI:      {result['s3_uri']}")
-        print(f"📄 Filename:    {result['filename']}")
-        print(f"📅 Generated:   {result['generated_at']}")
-        
-        if args.public:
-            print(f"🌐 Public URL:  {result['public_url']}")
-            print("\n💡 You can share this URL directly!")
-        else:
-            print("\n💡 Image is private. Use --public flag for public access.")
-            print(f"   Or configure bucket policy for public reads.")
-        
-        print("="*60 + "\n")
+        for result in results:
+            _print_result(result, args.public)
         
-        # Return only the main URL for script automation
-        print(result['s3_uri'])
+        # Return only the main URL(s) for script automation
+        for result in results:
+            print(result['s3_uri'])
         
+        if failures:
+            logger.error(f"{failures} of {len(prompts)} prompt(s) failed")
+            return 1
         return 0
 
     except KeyboardInterrupt: